@@ -5,11 +5,25 @@ Bronze Layer SQL View Generator CLI
 A tool to help create SQL views for BigQuery bronze layer transformations.
 """
 import argparse
+import sys
 from src.bigquery_connector import BigQueryConnector
 from src.template_manager import TemplateManager
 from src.config_manager import ConfigManager
 from src.sql_generator import SQLGenerator
 from src.cli_manager import CLIManager
+from src.headless_cli import HeadlessCLI
+from src.table_creator import TableCreator
+from src.query_guardrails import add_guardrail_arguments, guardrails_from_args
+
+def positive_int(value):
+    """Parse a whole number of at least 1 for argparse"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value}")
+    return number
 
 def parse_arguments():
     """Parse command-line arguments"""
@@ -21,6 +35,33 @@ def parse_arguments():
         help='Path to the Google Cloud service account JSON credentials file'
     )
     
+    add_guardrail_arguments(parser)
+    
+    # Headless subcommands; without one the interactive menu is shown
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    
+    profile = subparsers.add_parser('profile', help='Profile all columns of tables in a BigQuery dataset')
+    profile.add_argument('dataset', help='Source dataset ID')
+    profile.add_argument('tables', nargs='*', help='Table IDs (default: all tables in the dataset)')
+    
+    generate = subparsers.add_parser('generate', help='Generate SQL files from saved configs')
+    generate.add_argument('dataset', help='Source dataset ID')
+    generate.add_argument('tables', nargs='*', help='Table IDs (default: all configs of the dataset)')
+    
+    for name, help_text in [('validate', 'Dry-run generated SQL files in BigQuery'),
+                            ('deploy', 'Create the views from generated SQL files')]:
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument('dataset', help='Source dataset ID')
+        command.add_argument('tables', nargs='*', help='Table IDs (default: all SQL files of the dataset)')
+        command.add_argument('--max-in-flight', type=positive_int, default=20,
+                             help='Maximum number of BigQuery jobs running at once (default: 20)')
+    
+    preview = subparsers.add_parser('preview', help='Preview rows of a table or view')
+    preview.add_argument('dataset', help='Dataset ID')
+    preview.add_argument('table', help='Table or view ID')
+    preview.add_argument('--columns', help='Comma-separated column names (default: all)')
+    preview.add_argument('--limit', type=int, default=5, help='Number of rows (default: 5)')
+    
     return parser.parse_args()
 
 def main():
@@ -29,14 +70,29 @@ def main():
     args = parse_arguments()
     
     # Initialize components
-    bq = BigQueryConnector(credentials_path=args.credentials)
     templates = TemplateManager()
     configs = ConfigManager()
     sql_generator = SQLGenerator(templates)
     
+    if args.command:
+        # Headless mode: JSON report on stdout, outcome in the exit code
+        headless_cli = HeadlessCLI(
+            lambda: BigQueryConnector(credentials_path=args.credentials,
+                                      guardrails=guardrails_from_args(args)),
+            configs, sql_generator, TableCreator
+        )
+        sys.exit(headless_cli.run(args))
+    
+    bq = BigQueryConnector(credentials_path=args.credentials, guardrails=guardrails_from_args(args))
+    
     # Run CLI Manager
     cli_manager = CLIManager(bq, templates, configs, sql_generator)
-    cli_manager.run()
+    try:
+        cli_manager.run()
+    finally:
+        # Cancel any job still running (e.g. after Ctrl+C) and release connections
+        bq.close()
+        print(f"\n{bq.guardrails.summary()}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
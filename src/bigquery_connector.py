@@ -2,87 +2,323 @@
 Module for handling BigQuery connections and queries
 """
 import os
+import threading
+import google.auth
+from google.api_core import exceptions as api_exceptions
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import bigquery
+from google.cloud.bigquery.retry import DEFAULT_JOB_RETRY as BIGQUERY_JOB_RETRY
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+from src.column_profiles import ColumnProfiles, PROFILE_SCHEMA
+from src.formatter import format_bytes
+from src.query_guardrails import QueryGuardrails
+from src.schema_utils import split_column_path
+
+# Shared retry policy for API calls and jobs: exponential backoff with jitter on
+# transient errors (429 rate limits, 5xx backend errors, connection resets)
+DEFAULT_RETRY = bigquery.DEFAULT_RETRY.with_deadline(120.0)
+DEFAULT_JOB_RETRY = BIGQUERY_JOB_RETRY.with_deadline(600.0)
+
+# Seconds to wait for a single API request, and for a query job to finish
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_JOB_TIMEOUT = 600.0
+
+# HTTP status codes that are worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class BigQueryError(Exception):
+    """Structured error raised or returned by BigQueryConnector"""
+    
+    def __init__(self, operation, message, status_code=None, reason=None, job_id=None):
+        """
+        Initialize BigQuery error.
+        
+        Args:
+            operation: What the connector was doing, e.g. "executing query"
+            message: Underlying error message
+            status_code: HTTP status code, if the error came from the API
+            reason: BigQuery error reason, e.g. "rateLimitExceeded"
+            job_id: ID of the job that failed, if any
+        """
+        super().__init__(f"Error {operation}: {message}")
+        self.operation = operation
+        self.message = message
+        self.status_code = status_code
+        self.reason = reason
+        self.job_id = job_id
+    
+    @property
+    def retryable(self):
+        """Whether the error is transient and the call can be retried"""
+        return self.status_code in RETRYABLE_STATUS_CODES
+    
+    @classmethod
+    def from_exception(cls, operation, error, job_id=None):
+        """Build a BigQueryError from any exception raised by the client"""
+        if isinstance(error, cls):
+            return error
+        
+        status_code = getattr(error, "code", None)
+        errors = getattr(error, "errors", None) or []
+        reason = errors[0].get("reason") if errors and isinstance(errors[0], dict) else None
+        message = getattr(error, "message", None) or str(error)
+        if reason == "bytesBilledLimitExceeded":
+            message = ("Query refused by the bytes-billed guardrail, nothing was billed. "
+                       "Narrow the query or raise --max-bytes-billed. "
+                       f"({message})")
+        return cls(operation, message, status_code=status_code, reason=reason, job_id=job_id)
+    
+    def to_dict(self):
+        """Return the error as a JSON-serializable dictionary"""
+        return {
+            "operation": self.operation,
+            "message": self.message,
+            "status_code": self.status_code,
+            "reason": self.reason,
+            "job_id": self.job_id,
+            "retryable": self.retryable
+        }
 
 class BigQueryConnector:
     """Handles BigQuery connections and queries"""
     
-    def __init__(self, credentials_path=None):
+    def __init__(self, credentials_path=None, max_workers=8, timeout=DEFAULT_TIMEOUT,
+                 job_timeout=DEFAULT_JOB_TIMEOUT, guardrails=None):
         """
         Initialize BigQuery connector.
         
+        The client is safe to share between threads: its HTTP connection pool is
+        sized to max_workers so concurrent callers don't wait for a connection.
+        
         Args:
             credentials_path (str, optional): Path to the service account JSON credentials file.
                 If not provided, uses application default credentials.
+            max_workers (int): Number of threads expected to use the connector concurrently
+            timeout (float): Seconds to wait for a single API request
+            job_timeout (float): Seconds to wait for a query job to finish
+            guardrails (QueryGuardrails, optional): Cost guardrails applied to every job.
+                Defaults to QueryGuardrails() with its default bytes-billed cap.
         """
         if credentials_path and os.path.exists(credentials_path):
             # Use service account credentials file
-            credentials = service_account.Credentials.from_service_account_file(credentials_path)
-            self.client = bigquery.Client(credentials=credentials)
+            credentials = service_account.Credentials.from_service_account_file(
+                credentials_path, scopes=bigquery.Client.SCOPE
+            )
+            project = credentials.project_id
         else:
             # Use application default credentials
-            self.client = bigquery.Client()
+            credentials, project = google.auth.default(scopes=bigquery.Client.SCOPE)
+        
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.job_timeout = job_timeout
+        self.guardrails = guardrails or QueryGuardrails()
+        self.client = bigquery.Client(
+            project=project,
+            credentials=credentials,
+            _http=self._create_session(credentials, max_workers)
+        )
+        
+        # Jobs that have been submitted but not finished, cancelled on close(). Keyed by
+        # id(job): when job_retry resubmits a failed job, QueryJob.result() swaps the new
+        # job into the same object, which changes its job_id
+        self._jobs = {}
+        self._jobs_lock = threading.Lock()
+    
+    @staticmethod
+    def _create_session(credentials, max_workers):
+        """Create an authorized HTTP session with a connection pool sized to max_workers"""
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        session.mount("https://", adapter)
+        return session
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def submit_query(self, query, job_config=None, dataset_id=None, table_id=None, phase=None,
+                     block=True):
+        """
+        Start a query job with the shared retry policy and track it as in-flight.
+        
+        The guardrails add the bytes-billed cap, labels and priority to the job and
+        reserve the cap against the budgets until the job is forgotten. If other
+        running jobs hold the budget, this waits for them to finish, or raises a
+        "budgetReserved" BigQueryError if block is False. The job is refused with
+        "budgetExceeded" once the billed bytes used up the session or command budget.
+        dataset_id, table_id and phase only feed the job labels.
+        """
+        dry_run = job_config is not None and job_config.dry_run
+        job_config = self.guardrails.apply(job_config, dataset_id=dataset_id,
+                                           table_id=table_id, phase=phase)
+        reservation = None
+        if not dry_run:
+            reservation, refusal = self.guardrails.reserve(job_config, block=block)
+            if refusal:
+                reason, message = refusal
+                raise BigQueryError("submitting query", message, reason=reason)
+        
+        try:
+            job = self.client.query(
+                query,
+                job_config=job_config,
+                retry=DEFAULT_RETRY,
+                timeout=self.timeout,
+                job_retry=DEFAULT_JOB_RETRY
+            )
+        except Exception:
+            self.guardrails.release(reservation)
+            raise
+        if not job.dry_run:
+            # Dry runs complete immediately and have nothing to cancel
+            with self._jobs_lock:
+                self._jobs[id(job)] = (job, reservation)
+        return job
+    
+    def forget_job(self, job):
+        """
+        Stop tracking a finished job so close() won't try to cancel it, and charge its
+        bytes in place of its reservation.
+        
+        Only call this once the job has finished or failed; on KeyboardInterrupt the job
+        must stay tracked so close() cancels it.
+        """
+        with self._jobs_lock:
+            tracked = self._jobs.pop(id(job), None)
+        if tracked is not None:
+            self.guardrails.record(job, tracked[1])
+    
+    def run_query(self, query, job_config=None, dataset_id=None, table_id=None, phase=None,
+                  **result_kwargs):
+        """Run a query job to completion and return its row iterator"""
+        job = self.submit_query(query, job_config, dataset_id=dataset_id, table_id=table_id,
+                                phase=phase)
+        try:
+            results = job.result(retry=DEFAULT_RETRY, timeout=self.job_timeout, **result_kwargs)
+        except Exception:
+            self.forget_job(job)
+            raise
+        self.forget_job(job)
+        return results
+    
+    def cancel_jobs(self):
+        """Cancel all in-flight jobs, returning the IDs of the jobs that were cancelled"""
+        with self._jobs_lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+        
+        cancelled = []
+        for job, reservation in jobs:
+            self.guardrails.release(reservation)
+            try:
+                job.cancel(timeout=self.timeout)
+                cancelled.append(job.job_id)
+            except api_exceptions.GoogleAPICallError:
+                # The job may have finished in the meantime
+                continue
+        return cancelled
+    
+    def close(self):
+        """Cancel in-flight jobs and release the HTTP connection pool"""
+        self.cancel_jobs()
+        self.client.close()
     
     def list_datasets(self):
         """List all available datasets"""
-        return [dataset.dataset_id for dataset in self.client.list_datasets()]
+        datasets = self.client.list_datasets(retry=DEFAULT_RETRY, timeout=self.timeout)
+        return [dataset.dataset_id for dataset in datasets]
     
     def list_tables(self, dataset_id):
         """List all tables in a dataset"""
-        return [table.table_id for table in self.client.list_tables(dataset_id)]
+        tables = self.client.list_tables(dataset_id, retry=DEFAULT_RETRY, timeout=self.timeout)
+        return [table.table_id for table in tables]
     
     def get_table_schema(self, dataset_id, table_id):
         """Get schema information for a table"""
         table_ref = self.client.dataset(dataset_id).table(table_id)
-        table = self.client.get_table(table_ref)
+        table = self.client.get_table(table_ref, retry=DEFAULT_RETRY, timeout=self.timeout)
         return table.schema
     
-    def get_sample_values(self, dataset_id, table_id, column_name):
-        """Get 3 random non-empty sample values from a column"""
-        query = f"""
-        SELECT {column_name}
-        FROM `{self.client.project}.{dataset_id}.{table_id}`
-        WHERE {column_name} IS NOT NULL 
-        AND TRIM(CAST({column_name} AS STRING)) != ''
+    @staticmethod
+    def _column_reference(parts):
+        """
+        Resolve (name, repeated) path parts against the table alias t.
+        
+        Returns:
+            Tuple of (expression, unnests) where each ARRAY level becomes a
+            correlated UNNEST and expression refers to the innermost value
+        """
+        source = "t"
+        unnests = []
+        for depth, (name, repeated) in enumerate(parts):
+            source = f"{source}.`{name}`"
+            if repeated:
+                unnests.append(f"UNNEST({source}) AS e{depth}")
+                source = f"e{depth}"
+        return source, unnests
+    
+    def _column_source(self, dataset_id, table_id, column_name):
+        """Return (FROM clause, expression) for a top-level column or a leaf path like "items[].sku" """
+        column, unnests = self._column_reference(split_column_path(column_name))
+        from_clause = ", ".join([f"`{self.client.project}.{dataset_id}.{table_id}` AS t"] + unnests)
+        return from_clause, column
+    
+    def build_sample_values_query(self, dataset_id, table_id, column_name):
+        """Build the query used by get_sample_values"""
+        from_clause, column = self._column_source(dataset_id, table_id, column_name)
+        return f"""
+        SELECT {column}
+        FROM {from_clause}
+        WHERE {column} IS NOT NULL 
+        AND TRIM(CAST({column} AS STRING)) != ''
         ORDER BY RAND()
         LIMIT 3
         """
+    
+    def get_sample_values(self, dataset_id, table_id, column_name):
+        """Get 3 random non-empty sample values from a column"""
+        query = self.build_sample_values_query(dataset_id, table_id, column_name)
         try:
-            results = self.client.query(query).result()
+            results = self.run_query(query, dataset_id=dataset_id, table_id=table_id, phase="profile")
             return [str(row[0]) for row in results]
         except Exception as e:
-            return [f"Error retrieving samples: {e}"]
+            return [str(BigQueryError.from_exception("retrieving samples", e))]
     
     def get_unique_values(self, dataset_id, table_id, column_name):
         """Get up to 3 unique values from a column with counts"""
+        from_clause, column = self._column_source(dataset_id, table_id, column_name)
         query = f"""
         SELECT 
-            {column_name},
+            {column} AS value,
             COUNT(*) as count
-        FROM `{self.client.project}.{dataset_id}.{table_id}`
-        WHERE {column_name} IS NOT NULL
-        GROUP BY {column_name}
+        FROM {from_clause}
+        WHERE {column} IS NOT NULL
+        GROUP BY value
         ORDER BY count DESC
         LIMIT 3
         """
         try:
-            results = self.client.query(query).result()
+            results = self.run_query(query, dataset_id=dataset_id, table_id=table_id, phase="profile")
             return [(str(row[0]), row[1]) for row in results]
         except Exception as e:
-            return [(f"Error retrieving unique values: {e}", 0)]
+            return [(str(BigQueryError.from_exception("retrieving unique values", e)), 0)]
     
     def get_column_stats(self, dataset_id, table_id, column_name):
         """Get basic statistics for a column"""
+        from_clause, column = self._column_source(dataset_id, table_id, column_name)
         query = f"""
         SELECT 
             COUNT(*) as total_count,
-            COUNTIF({column_name} IS NULL) as null_count,
-            COUNTIF(CAST({column_name} AS STRING) = '') as empty_string_count
-        FROM `{self.client.project}.{dataset_id}.{table_id}`
+            COUNTIF({column} IS NULL) as null_count,
+            COUNTIF(CAST({column} AS STRING) = '') as empty_string_count
+        FROM {from_clause}
         """
         try:
-            row = next(self.client.query(query).result())
+            row = next(iter(self.run_query(query, dataset_id=dataset_id, table_id=table_id, phase="profile")))
             return {
                 "total_count": row.total_count,
                 "null_count": row.null_count,
@@ -90,26 +326,103 @@ class BigQueryConnector:
                 "not_null_percent": round(100 * (row.total_count - row.null_count) / row.total_count, 2) if row.total_count > 0 else 0
             }
         except Exception as e:
-            return {"error": str(e)}
+            return {"error": BigQueryError.from_exception("retrieving column stats", e)}
+    
+    def _leaf_values_sql(self, leaf):
+        """Build an ARRAY<STRUCT<column_path, value>> expression with every value of a leaf in a row"""
+        source, unnests = self._column_reference(leaf.parts)
+        
+        if leaf.field_type == "GEOGRAPHY":
+            value = f"ST_ASTEXT({source})"
+        elif leaf.field_type == "JSON":
+            value = f"TO_JSON_STRING({source})"
+        else:
+            value = f"CAST({source} AS STRING)"
+        
+        if not unnests:
+            return f"[STRUCT('{leaf.path}' AS column_path, {value} AS value)]"
+        return (f"ARRAY(SELECT AS STRUCT '{leaf.path}' AS column_path, {value} AS value "
+                f"FROM {', '.join(unnests)})")
+    
+    def build_profile_query(self, dataset_id, table_id, leaves, top_count=3, sample_count=3):
+        """
+        Build a single query that profiles all leaf columns of a table in one scan.
+        
+        Every row is unpivoted into (column_path, value) pairs, one per leaf value,
+        and the pairs are aggregated per column path.
+        """
+        leaf_values = ",\n            ".join(self._leaf_values_sql(leaf) for leaf in leaves)
+        return f"""
+        SELECT 
+            leaf.column_path,
+            COUNT(*) AS total_count,
+            COUNTIF(leaf.value IS NULL) AS null_count,
+            COUNTIF(leaf.value = '') AS empty_string_count,
+            APPROX_TOP_COUNT(leaf.value, {top_count + 1}) AS top_values,
+            ARRAY_AGG(IF(TRIM(leaf.value) != '', leaf.value, NULL) IGNORE NULLS
+                      ORDER BY RAND() LIMIT {sample_count}) AS samples
+        FROM `{self.client.project}.{dataset_id}.{table_id}` AS t,
+        UNNEST(ARRAY_CONCAT(
+            {leaf_values}
+        )) AS leaf
+        GROUP BY leaf.column_path
+        """
+    
+    def profile_columns(self, dataset_id, table_id, leaves, top_count=3, sample_count=3):
+        """
+        Profile all leaf columns (including nested ones) with a single query.
+        
+        Args:
+            dataset_id: Dataset ID
+            table_id: Table ID
+            leaves: List of ColumnLeaf objects, see schema_utils.flatten_schema
+            top_count: Number of most common values to return per column
+            sample_count: Number of random non-empty sample values to return per column
+            
+        Returns:
+            Tuple of (success, result) where result is a ColumnProfiles, or a BigQueryError
+        """
+        if not leaves:
+            return True, ColumnProfiles(PROFILE_SCHEMA.empty_table(), top_count)
+        
+        query = self.build_profile_query(dataset_id, table_id, leaves, top_count, sample_count)
+        try:
+            results = self.run_query(query, dataset_id=dataset_id, table_id=table_id, phase="profile")
+            
+            # Keep the results columnar all the way from BigQuery to the profile
+            return True, ColumnProfiles.from_query_results(results.to_arrow(), leaves, top_count)
+        except Exception as e:
+            return False, BigQueryError.from_exception("profiling columns", e)
     
-    def execute_query(self, query):
+    @staticmethod
+    def job_message(job):
+        """Describe a successful job: the bytes a dry run would process, or the job ID"""
+        if job.dry_run:
+            return f"Query is valid. It would process {format_bytes(job.total_bytes_processed)}."
+        return f"Query executed successfully. Job ID: {job.job_id}"
+    
+    def execute_query(self, query, dataset_id=None, table_id=None, phase="deploy"):
         """Execute a SQL query"""
+        job = None
         try:
-            job = self.client.query(query)
-            job.result()  # Wait for the job to complete
-            return True, f"Query executed successfully. Job ID: {job.job_id}"
+            job = self.submit_query(query, dataset_id=dataset_id, table_id=table_id, phase=phase)
+            job.result(retry=DEFAULT_RETRY, timeout=self.job_timeout)  # Wait for the job to complete
         except Exception as e:
-            return False, f"Error executing query: {e}"
+            if job is not None:
+                self.forget_job(job)
+            return False, BigQueryError.from_exception("executing query", e,
+                                                       job_id=job.job_id if job else None)
+        self.forget_job(job)
+        return True, self.job_message(job)
     
     def preview_table(self, full_table_name, limit=5):
         """Execute a SELECT * LIMIT query on a table and return results in a structured format"""
         query = f"SELECT * FROM {full_table_name} LIMIT {limit}"
         try:
-            query_job = self.client.query(query)
-            results = query_job.result()
+            results = self.run_query(query, phase="preview")
             
             # Get schema information with column types
-            schema_fields = query_job.result().schema
+            schema_fields = results.schema
             
             # Create a list of column names
             column_names = [field.name for field in schema_fields]
@@ -121,7 +434,7 @@ class BigQueryConnector:
             rows = []
             for row in results:
                 rows.append({col: str(val) for col, val in row.items()})
-                
+            
             return True, {
                 "schema": column_names,
                 "column_types": column_types,
@@ -130,4 +443,54 @@ class BigQueryConnector:
                 "column_count": len(column_names)
             }
         except Exception as e:
-            return False, f"Error previewing table: {e}" 
\ No newline at end of file
+            return False, BigQueryError.from_exception("previewing table", e)
+    
+    def stream_table_rows(self, table_name, columns=None, limit=5, page_size=100):
+        """
+        Stream rows from a table or view as Arrow record batches.
+        
+        Args:
+            table_name: Full table name, optionally wrapped in backticks
+            columns: Optional list of top-level column names to fetch (default: all)
+            limit: Maximum number of rows to fetch
+            page_size: Number of rows per page, i.e. per record batch
+        
+        Returns:
+            Tuple of (success, result) where result holds the schema, column types
+            and a lazy iterator of record batches, or a BigQueryError
+        """
+        try:
+            table = self.client.get_table(table_name.strip('`'), retry=DEFAULT_RETRY,
+                                          timeout=self.timeout)
+            
+            fields = table.schema
+            if columns:
+                fields_by_name = {field.name: field for field in table.schema}
+                missing = [col for col in columns if col not in fields_by_name]
+                if missing:
+                    return False, BigQueryError("streaming table rows",
+                                                f"Unknown columns: {', '.join(missing)}")
+                fields = [fields_by_name[col] for col in columns]
+            
+            if table.table_type == "TABLE":
+                # Read through the table-read API: no query job and no bytes billed
+                rows = self.client.list_rows(
+                    table, selected_fields=fields, max_results=limit, page_size=page_size,
+                    retry=DEFAULT_RETRY, timeout=self.timeout
+                )
+            else:
+                # Views can't be read directly, so only select the requested columns
+                column_list = ", ".join(f"`{field.name}`" for field in fields)
+                query = (f"SELECT {column_list} "
+                         f"FROM `{table.project}.{table.dataset_id}.{table.table_id}` "
+                         f"LIMIT {limit}")
+                rows = self.run_query(query, dataset_id=table.dataset_id, table_id=table.table_id,
+                                      phase="preview", page_size=page_size)
+            
+            return True, {
+                "schema": [field.name for field in fields],
+                "column_types": {field.name: field.field_type for field in fields},
+                "batches": rows.to_arrow_iterable()
+            }
+        except Exception as e:
+            return False, BigQueryError.from_exception("streaming table rows", e)
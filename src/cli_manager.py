@@ -4,6 +4,7 @@ Module for managing the main CLI interface
 import json
 from src.interactive_cli import InteractiveCLI
 from src.table_creator import TableCreator
+from src.preview_engine import PreviewEngine
 from src.formatter import calculate_max_width, format_column_with_type, format_preview_row
 
 class CLIManager:
@@ -20,6 +21,7 @@ class CLIManager:
             bq_connector, template_manager, config_manager, sql_generator
         )
         self.table_creator = TableCreator(bq_connector)
+        self.preview_engine = PreviewEngine(bq_connector)
     
     def select_operation_mode(self):
         """Let user select between generate SQL or create tables mode"""
@@ -82,6 +84,32 @@ class CLIManager:
         print("\nData (JSON format):")
         print(json.dumps(preview_data['rows'], indent=2))
     
+    def display_table_preview_paged(self, view_name):
+        """Stream a larger preview page by page and optionally export it"""
+        columns = input("\nColumns to include (comma separated, blank for all): ").strip()
+        columns = [col.strip() for col in columns.split(",") if col.strip()] or None
+        
+        while True:
+            try:
+                limit = input("Number of rows (default 50): ").strip()
+                limit = int(limit) if limit else 50
+                break
+            except ValueError:
+                print("Please enter a valid number.")
+        
+        success, preview = self.preview_engine.open(f"`{view_name}`", columns=columns, limit=limit)
+        if not success:
+            print(f"\nError: {preview}")
+            return
+        
+        print(f"\nPreview of {view_name} (up to {limit} rows, {len(preview['schema'])} columns):")
+        self.preview_engine.page(preview)
+        
+        path = input("\nExport to file (path ending in .csv or .parquet, blank to skip): ").strip()
+        if path:
+            success, message = self.preview_engine.export(preview, path)
+            print(f"\n{'Success' if success else 'Error'}: {message}")
+    
     def run_create_tables_mode(self):
         """Run the create tables mode"""
         print("\n=== Create Tables from SQL Files ===\n")
@@ -146,6 +174,7 @@ class CLIManager:
                     print("\nHow would you like to view the preview?")
                     print("1. Transposed (column: value format)")
                     print("2. JSON format")
+                    print("3. Paged (choose columns and rows, export to CSV/Parquet)")
                     
                     while True:
                         try:
@@ -156,8 +185,11 @@ class CLIManager:
                             elif view_mode == 2:
                                 self.display_table_preview_as_json(result["preview"])
                                 break
+                            elif view_mode == 3:
+                                self.display_table_preview_paged(result["view_name"])
+                                break
                             else:
-                                print("Invalid selection. Please enter 1 or 2.")
+                                print("Invalid selection. Please enter 1, 2 or 3.")
                         except ValueError:
                             print("Please enter a valid number.")
                             
@@ -176,7 +208,9 @@ class CLIManager:
         
         if mode == 1:
             # Generate SQL views mode
-            self.interactive_cli.run()
+            with self.bq_connector.guardrails.command("generate"):
+                self.interactive_cli.run()
         elif mode == 2:
             # Create tables mode
-            self.run_create_tables_mode() 
\ No newline at end of file
+            with self.bq_connector.guardrails.command("deploy"):
+                self.run_create_tables_mode() 
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Module for the compact, columnar in-memory representation of column profiles
+"""
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# One row per profiled column; list columns hold the top values and samples
+PROFILE_SCHEMA = pa.schema([
+    ("column_path", pa.string()),
+    ("field_type", pa.string()),
+    ("total_count", pa.int64()),
+    ("null_count", pa.int64()),
+    ("empty_string_count", pa.int64()),
+    ("top_values", pa.list_(pa.struct([("value", pa.string()), ("count", pa.int64())]))),
+    ("samples", pa.list_(pa.string()))
+])
+
+class ColumnProfile:
+    """Read-only view of one column of ColumnProfiles; it holds no data of its own"""
+    
+    __slots__ = ("_profiles", "_index")
+    
+    def __init__(self, profiles, index):
+        self._profiles = profiles
+        self._index = index
+    
+    def _value(self, name):
+        return self._profiles.table.column(name)[self._index].as_py()
+    
+    @property
+    def path(self):
+        return self._value("column_path")
+    
+    @property
+    def field_type(self):
+        return self._value("field_type")
+    
+    @property
+    def total_count(self):
+        return self._value("total_count")
+    
+    @property
+    def null_count(self):
+        return self._value("null_count")
+    
+    @property
+    def empty_string_count(self):
+        return self._value("empty_string_count")
+    
+    @property
+    def not_null_percent(self):
+        total_count = self.total_count
+        return round(100 * (total_count - self.null_count) / total_count, 2) if total_count > 0 else 0
+    
+    @property
+    def top_values(self):
+        """Most common non-null values as (value, count) tuples"""
+        top_values = [(top["value"], top["count"]) for top in self._value("top_values")
+                      if top["value"] is not None]
+        return top_values[:self._profiles.top_count]
+    
+    @property
+    def samples(self):
+        return self._value("samples")
+    
+    def stats(self):
+        """Return the statistics in the same format as BigQueryConnector.get_column_stats"""
+        return {
+            "total_count": self.total_count,
+            "null_count": self.null_count,
+            "empty_string_count": self.empty_string_count,
+            "not_null_percent": self.not_null_percent
+        }
+
+class ColumnProfiles:
+    """Profiles of all columns of a table, stored column-wise in a single Arrow table"""
+    
+    def __init__(self, table, top_count=3):
+        """
+        Initialize column profiles.
+        
+        Args:
+            table: Arrow table with PROFILE_SCHEMA
+            top_count: Number of most common values exposed per column
+        """
+        self.table = table
+        self.top_count = top_count
+        self._index = {path: i for i, path in enumerate(table.column("column_path").to_pylist())}
+    
+    @classmethod
+    def from_query_results(cls, results, leaves, top_count=3):
+        """
+        Build profiles from the Arrow results of BigQueryConnector.build_profile_query.
+        
+        Rows are put in schema order, and leaves without any value (e.g. always-empty
+        arrays) get an empty profile since the query returns no row for them.
+        """
+        field_types = {leaf.path: leaf.field_type for leaf in leaves}
+        paths = results.column("column_path").to_pylist()
+        
+        columns = []
+        for field in PROFILE_SCHEMA:
+            if field.name == "field_type":
+                columns.append(pa.array([field_types.get(path) for path in paths], pa.string()))
+            else:
+                columns.append(results.column(field.name).cast(field.type))
+        table = pa.Table.from_arrays(columns, schema=PROFILE_SCHEMA)
+        
+        found = set(paths)
+        missing = [leaf for leaf in leaves if leaf.path not in found]
+        if missing:
+            table = pa.concat_tables([table, pa.table({
+                "column_path": [leaf.path for leaf in missing],
+                "field_type": [leaf.field_type for leaf in missing],
+                "total_count": [0] * len(missing),
+                "null_count": [0] * len(missing),
+                "empty_string_count": [0] * len(missing),
+                "top_values": [[] for _ in missing],
+                "samples": [[] for _ in missing]
+            }, schema=PROFILE_SCHEMA)])
+        
+        order = {path: i for i, path in enumerate(table.column("column_path").to_pylist())}
+        table = table.take([order[leaf.path] for leaf in leaves])
+        return cls(table, top_count)
+    
+    def __len__(self):
+        return self.table.num_rows
+    
+    def __contains__(self, path):
+        return path in self._index
+    
+    def paths(self):
+        """Column paths in schema order"""
+        return self.table.column("column_path").to_pylist()
+    
+    def column(self, path):
+        """Return a view of one column's profile, or None if the column wasn't profiled"""
+        index = self._index.get(path)
+        return ColumnProfile(self, index) if index is not None else None
+    
+    def save(self, path):
+        """Write the profiles to a compressed Arrow IPC (Feather) file"""
+        feather.write_feather(self.table, path, compression="zstd")
+        return path
+    
+    @classmethod
+    def load(cls, path, top_count=3):
+        """Load profiles saved with save(), raising ValueError if the file holds something else"""
+        table = feather.read_table(path)
+        if not table.schema.equals(PROFILE_SCHEMA):
+            raise ValueError(f"{path} is not a column profile file")
+        return cls(table, top_count)
@@ -28,4 +28,19 @@ class ConfigManager:
         if os.path.exists(config_path):
             with open(config_path, 'r') as f:
                 return json.load(f)
-        return None 
\ No newline at end of file
+        return None 
+    
+    def list_configs(self):
+        """List all (dataset_id, table_id) pairs that have a config file"""
+        if not os.path.exists(self.config_dir):
+            return []
+        
+        configs = []
+        for dataset_id in sorted(os.listdir(self.config_dir)):
+            dataset_dir = os.path.join(self.config_dir, dataset_id)
+            if not os.path.isdir(dataset_dir):
+                continue
+            for filename in sorted(os.listdir(dataset_dir)):
+                if filename.endswith('.json'):
+                    configs.append((dataset_id, filename[:-5]))
+        return configs
\ No newline at end of file
@@ -62,4 +62,20 @@ def format_preview_row(row, schema, column_types, max_width=None):
         # Create the display line with consistent spacing after colon
         lines.append(f"{formatted_col}: {value}")
     
-    return lines 
\ No newline at end of file
+    return lines 
+
+def format_bytes(num_bytes):
+    """
+    Format a number of bytes for display.
+    
+    Args:
+        num_bytes: Number of bytes
+        
+    Returns:
+        Human-readable string, e.g. "1.50 GiB"
+    """
+    size = float(num_bytes or 0)
+    for unit in ["B", "KiB", "MiB", "GiB", "TiB"]:
+        if size < 1024 or unit == "TiB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.2f} {unit}"
+        size /= 1024
@@ -0,0 +1,210 @@
+"""
+Module for the non-interactive (headless) command-line subcommands
+"""
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from src.bigquery_connector import BigQueryError
+from src.schema_utils import flatten_schema
+
+# Error reasons meaning a query was refused by the guardrails
+BUDGET_REASONS = ("budgetExceeded", "bytesBilledLimitExceeded")
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1        # At least one table failed
+EXIT_USAGE = 2         # Bad arguments or nothing to do (same code argparse uses)
+EXIT_BUDGET = 3        # Refused by the query guardrails
+
+class HeadlessCLI:
+    """Runs profile/generate/validate/deploy/preview for many tables and reports JSON"""
+    
+    def __init__(self, connect, config_manager, sql_generator, table_creator_factory,
+                 profile_dir="profiles", output=sys.stdout):
+        """
+        Initialize headless CLI.
+        
+        Args:
+            connect: Callable returning the BigQuery connector; only called by
+                commands that need BigQuery, so generate works offline
+            config_manager: Config manager instance
+            sql_generator: SQL generator instance
+            table_creator_factory: Callable taking a connector and returning a TableCreator
+            profile_dir: Directory where profiles are cached, shared with InteractiveCLI
+            output: Stream the JSON report is written to
+        """
+        self.connect = connect
+        self.configs = config_manager
+        self.sql_generator = sql_generator
+        self.table_creator_factory = table_creator_factory
+        self.profile_dir = profile_dir
+        self.output = output
+        self._bq = None
+    
+    @property
+    def bq(self):
+        """BigQuery connector, created on first use"""
+        if self._bq is None:
+            self._bq = self.connect()
+        return self._bq
+    
+    def close(self):
+        """Close the BigQuery connector if one was created"""
+        if self._bq is not None:
+            self._bq.close()
+    
+    def report(self, command, results):
+        """Write the JSON report and return the exit code for the results"""
+        failed = [result for result in results if not result["success"]]
+        report = {
+            "command": command,
+            "succeeded": len(results) - len(failed),
+            "failed": len(failed),
+            "results": results
+        }
+        if self._bq is not None:
+            report["bytes_billed"] = self._bq.guardrails.session_bytes
+        json.dump(report, self.output, indent=2, default=str)
+        self.output.write("\n")
+        
+        if not results:
+            return EXIT_USAGE
+        if any(isinstance(result["error"], dict) and result["error"]["reason"] in BUDGET_REASONS
+               for result in failed):
+            return EXIT_BUDGET
+        return EXIT_FAILED if failed else EXIT_OK
+    
+    @staticmethod
+    def error_result(dataset_id, table_id, error):
+        """Build a failed result entry, keeping structured errors structured"""
+        return {
+            "dataset": dataset_id,
+            "table": table_id,
+            "success": False,
+            "error": error.to_dict() if hasattr(error, "to_dict") else str(error)
+        }
+    
+    def local_tables(self, dataset_id, table_ids):
+        """Select tables that have a config file, all of the dataset's if none are given"""
+        available = [table_id for config_dataset, table_id in self.configs.list_configs()
+                     if config_dataset == dataset_id]
+        return table_ids or available
+    
+    def profile(self, dataset_id, table_ids):
+        """Profile every column of the selected tables, several tables at a time"""
+        table_ids = table_ids or self.bq.list_tables(dataset_id)
+        
+        def profile_table(table_id):
+            try:
+                leaves = flatten_schema(self.bq.get_table_schema(dataset_id, table_id))
+            except Exception as e:
+                return self.error_result(dataset_id, table_id,
+                                         BigQueryError.from_exception("getting table schema", e))
+            
+            success, profiles = self.bq.profile_columns(dataset_id, table_id, leaves)
+            if not success:
+                return self.error_result(dataset_id, table_id, profiles)
+            
+            # Refresh the cache used by the interactive mode
+            cache_path = os.path.join(self.profile_dir, dataset_id, f"{table_id}.arrow")
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                profiles.save(cache_path)
+            except OSError as e:
+                return self.error_result(dataset_id, table_id, f"Could not save profile to {cache_path}: {e}")
+            
+            columns = []
+            for path in profiles.paths():
+                profile = profiles.column(path)
+                columns.append({
+                    "path": path,
+                    "field_type": profile.field_type,
+                    **profile.stats(),
+                    "top_values": profile.top_values,
+                    "samples": profile.samples
+                })
+            return {"dataset": dataset_id, "table": table_id, "success": True,
+                    "profile_path": cache_path, "columns": columns}
+        
+        with ThreadPoolExecutor(max_workers=self.bq.max_workers) as executor:
+            results = list(executor.map(profile_table, table_ids))
+        return self.report("profile", results)
+    
+    def generate(self, dataset_id, table_ids):
+        """Generate SQL files from the saved configs, without connecting to BigQuery"""
+        results = []
+        for table_id in self.local_tables(dataset_id, table_ids):
+            try:
+                column_configs = self.configs.load_config(dataset_id, table_id)
+                if column_configs is None:
+                    results.append(self.error_result(dataset_id, table_id, f"Config file for {dataset_id}.{table_id} not found"))
+                    continue
+                sql_path = self.sql_generator.generate_sql(dataset_id, table_id, column_configs)
+            except Exception as e:
+                # e.g. invalid JSON in the config or a broken template; the other tables still run
+                results.append(self.error_result(dataset_id, table_id, e))
+                continue
+            results.append({"dataset": dataset_id, "table": table_id, "success": True, "sql_path": sql_path})
+        return self.report("generate", results)
+    
+    def create(self, command, dataset_id, table_ids, dry_run, max_in_flight):
+        """Validate or deploy the SQL files of the selected tables concurrently"""
+        table_creator = self.table_creator_factory(self.bq)
+        table_ids = table_ids or table_creator.list_available_tables(dataset_id)
+        
+        results = []
+        tables = [(dataset_id, table_id) for table_id in table_ids]
+        for dataset_id, table_id, success, message in table_creator.create_tables(
+                tables, dry_run=dry_run, max_in_flight=max_in_flight):
+            if success:
+                results.append({"dataset": dataset_id, "table": table_id, "success": True, "message": message})
+            else:
+                results.append(self.error_result(dataset_id, table_id, message))
+        return self.report(command, results)
+    
+    def preview(self, dataset_id, table_id, columns, limit):
+        """Preview a table, fetching only the requested columns and rows"""
+        success, preview = self.bq.stream_table_rows(
+            f"{self.bq.client.project}.{dataset_id}.{table_id}", columns=columns, limit=limit
+        )
+        if not success:
+            return self.report("preview", [self.error_result(dataset_id, table_id, preview)])
+        
+        try:
+            rows = [row for batch in preview["batches"] for row in batch.to_pylist()]
+        except Exception as e:
+            return self.report("preview", [self.error_result(dataset_id, table_id, e)])
+        
+        return self.report("preview", [{
+            "dataset": dataset_id,
+            "table": table_id,
+            "success": True,
+            "column_types": preview["column_types"],
+            "row_count": len(rows),
+            "rows": rows
+        }])
+    
+    def run(self, args):
+        """Run the subcommand selected on the command line and return its exit code"""
+        try:
+            if args.command == "profile":
+                with self.bq.guardrails.command("profile"):
+                    return self.profile(args.dataset, args.tables)
+            elif args.command == "generate":
+                return self.generate(args.dataset, args.tables)
+            elif args.command in ("validate", "deploy"):
+                with self.bq.guardrails.command(args.command):
+                    return self.create(args.command, args.dataset, args.tables,
+                                       dry_run=args.command == "validate",
+                                       max_in_flight=args.max_in_flight)
+            elif args.command == "preview":
+                columns = [col.strip() for col in args.columns.split(",")] if args.columns else None
+                with self.bq.guardrails.command("preview"):
+                    return self.preview(args.dataset, args.table, columns, args.limit)
+            return EXIT_USAGE
+        except Exception as e:
+            # e.g. the dataset doesn't exist or credentials are missing
+            return self.report(args.command, [self.error_result(args.dataset, None, e)])
+        finally:
+            self.close()
@@ -2,6 +2,11 @@ from src.bigquery_connector import BigQueryConnector
 from src.template_manager import TemplateManager
 from src.config_manager import ConfigManager
 from src.sql_generator import SQLGenerator
+import os
+import time
+from src.job_engine import JobEngine
+from src.column_profiles import ColumnProfiles
+from src.schema_utils import flatten_schema
 
 """
 Module for the interactive command-line interface
@@ -10,11 +15,13 @@ Module for the interactive command-line interface
 class InteractiveCLI:
     """Interactive command-line interface for the tool"""
     
-    def __init__(self, bq_connector, template_manager, config_manager, sql_generator):
+    def __init__(self, bq_connector, template_manager, config_manager, sql_generator,
+                 profile_dir="profiles"):
         self.bq = bq_connector
         self.templates = template_manager
         self.configs = config_manager
         self.sql_generator = sql_generator
+        self.profile_dir = profile_dir
     
     def select_dataset(self):
         """Interactive dataset selection"""
@@ -54,12 +61,12 @@ class InteractiveCLI:
             except ValueError:
                 print("Please enter a valid number.")
     
-    def show_column_details(self, dataset_id, table_id, column_name):
-        """Show detailed information about a column"""
+    def show_column_details(self, dataset_id, table_id, column_name, profile=None):
+        """Show detailed information about a column, using its profile if already fetched"""
         print(f"\n--- Detailed information for column: {column_name} ---")
         
         # Get column statistics
-        stats = self.bq.get_column_stats(dataset_id, table_id, column_name)
+        stats = profile.stats() if profile else self.bq.get_column_stats(dataset_id, table_id, column_name)
         if "error" in stats:
             print(f"Error getting stats: {stats['error']}")
         else:
@@ -69,7 +76,10 @@ class InteractiveCLI:
             print(f"Not null: {stats['not_null_percent']}%")
         
         # Get most common values
-        unique_values = self.bq.get_unique_values(dataset_id, table_id, column_name)
+        if profile:
+            unique_values = profile.top_values
+        else:
+            unique_values = self.bq.get_unique_values(dataset_id, table_id, column_name)
         if unique_values:
             print("\nMost common values (value, count):")
             for value, count in unique_values:
@@ -77,19 +87,79 @@ class InteractiveCLI:
         
         input("\nPress Enter to continue...")
     
+    def prefetch_sample_values(self, dataset_id, table_id, column_names):
+        """Fetch sample values for all columns at once, running the queries concurrently"""
+        jobs = [
+            (
+                column_name,
+                self.bq.build_sample_values_query(dataset_id, table_id, column_name),
+                None,
+                {"dataset_id": dataset_id, "table_id": table_id, "phase": "profile"}
+            )
+            for column_name in column_names
+        ]
+        
+        samples = {}
+        for column_name, success, job, result in JobEngine(self.bq).run(jobs):
+            if success:
+                samples[column_name] = [str(row[0]) for row in result]
+            else:
+                samples[column_name] = [str(result)]
+        return samples
+    
+    def load_profiles(self, dataset_id, table_id, leaves):
+        """Profile all columns, reusing the cached profile if the user wants to"""
+        cache_path = os.path.join(self.profile_dir, dataset_id, f"{table_id}.arrow")
+        
+        profiles = None
+        if os.path.exists(cache_path):
+            try:
+                profiles = ColumnProfiles.load(cache_path)
+            except Exception as e:
+                # e.g. a truncated file or one written by another version; profile again
+                print(f"Ignoring unreadable cached profile {cache_path}: {e}")
+        
+        if profiles is not None:
+            # Only offer the cache if the table still has the same columns
+            if profiles.paths() == [leaf.path for leaf in leaves]:
+                cached_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(os.path.getmtime(cache_path)))
+                if input(f"Use cached profile from {cached_at}? (y/n): ").strip().lower() == 'y':
+                    return True, profiles
+        
+        print("Profiling columns...")
+        success, profiles = self.bq.profile_columns(dataset_id, table_id, leaves)
+        if success:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            profiles.save(cache_path)
+        return success, profiles
+    
     def process_columns(self, dataset_id, table_id):
         """Interactive column transformation selection"""
         schema = self.bq.get_table_schema(dataset_id, table_id)
         available_templates = self.templates.get_available_templates() + ['custom', 'skip']
         column_configs = {}
         
-        for field in schema:
+        # Nested RECORD/REPEATED columns are configured leaf by leaf, e.g. "items[].sku"
+        leaves = flatten_schema(schema)
+        
+        # Profile every column with a single query
+        success, profiles = self.load_profiles(dataset_id, table_id, leaves)
+        samples_by_column = None
+        if not success:
+            print(f"{profiles}\nFalling back to per-column queries...")
+            profiles = None
+            samples_by_column = self.prefetch_sample_values(
+                dataset_id, table_id, [leaf.path for leaf in leaves]
+            )
+        
+        for leaf in leaves:
             while True:
-                print(f"\nColumn: {field.name}")
-                print(f"Type: {field.field_type}")
+                print(f"\nColumn: {leaf.path}")
+                print(f"Type: {leaf.field_type}{' (REPEATED)' if leaf.repeated else ''}")
                 
                 # Get sample values
-                samples = self.bq.get_sample_values(dataset_id, table_id, field.name)
+                profile = profiles.column(leaf.path) if profiles else None
+                samples = profile.samples if profile else samples_by_column[leaf.path]
                 print("Sample values:")
                 for sample in samples:
                     print(f"  - {sample}")
@@ -107,11 +177,11 @@ class InteractiveCLI:
                     
                     if idx == len(available_templates):
                         # Show more details
-                        self.show_column_details(dataset_id, table_id, field.name)
+                        self.show_column_details(dataset_id, table_id, leaf.path, profile)
                         continue  # Go back to template selection
                     elif 0 <= idx < len(available_templates):
                         template_type = available_templates[idx]
-                        column_configs[field.name] = template_type
+                        column_configs[leaf.path] = template_type
                         break
                     else:
                         print("Invalid selection. Please try again.")
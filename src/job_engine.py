@@ -0,0 +1,161 @@
+"""
+Module for running many BigQuery jobs concurrently
+"""
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.bigquery_connector import BigQueryError, DEFAULT_RETRY
+
+class JobEngine:
+    """Submits BigQuery jobs without blocking and yields their results as they complete"""
+    
+    def __init__(self, bq_connector, max_in_flight=50, poll_interval=1.0):
+        """
+        Initialize job engine.
+        
+        Args:
+            bq_connector: BigQuery connector instance
+            max_in_flight: Maximum number of jobs submitted but not yet finished
+            poll_interval: Seconds between job status polls
+        """
+        self.bq = bq_connector
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+    
+    def run(self, jobs):
+        """
+        Run jobs with a bounded number in flight, yielding results in completion order.
+        
+        Submitting jobs, polling their status and fetching results all happen on a
+        thread pool sized to the connector's max_workers. Each poll interval, only
+        the jobs this engine started are polled, with one status request each.
+        Jobs that don't fit in the budget next to the running jobs' reservations
+        are held back until one of those jobs finishes.
+        
+        Args:
+            jobs: Iterable of (key, query), (key, query, job_config) or (key, query,
+                job_config, options) tuples, where options is a dict of dataset_id,
+                table_id and phase for the job labels. It is consumed lazily, so it
+                can be a generator of any length.
+        
+        Yields:
+            Tuples of (key, success, job, result) where result is the list of result
+            rows, or a BigQueryError on failure. job is None if submission failed.
+        """
+        jobs = iter(jobs)
+        running = {}  # id(job) -> (key, job), waiting for the next poll
+        futures = {}  # future -> (key, job, stage), stage is "submit", "poll" or "fetch"
+        submitting = {}  # future -> job item, for submissions
+        held = deque()  # job items waiting for running jobs to release budget reservations
+        released = False
+        last_poll = time.monotonic()
+        exhausted = False
+        
+        executor = ThreadPoolExecutor(max_workers=self.bq.max_workers)
+        try:
+            while True:
+                # Top up the in-flight window, held jobs first
+                while len(running) + len(futures) < self.max_in_flight:
+                    busy = bool(running or futures)
+                    if held:
+                        if busy and not released:
+                            break
+                        item = held.popleft()
+                    elif not exhausted:
+                        try:
+                            item = tuple(next(jobs))
+                        except StopIteration:
+                            exhausted = True
+                            break
+                    else:
+                        break
+                    # Pool threads must not wait for reservations our own running jobs hold,
+                    # since releasing them needs the pool; with none running, waiting is safe
+                    future = executor.submit(self._submit, item, not busy)
+                    futures[future] = (item[0], None, "submit")
+                    submitting[future] = item
+                released = False
+                
+                if exhausted and not held and not running and not futures:
+                    return
+                
+                # Wait for submissions/polls/fetches, but no longer than the next poll
+                timeout = max(0.0, last_poll + self.poll_interval - time.monotonic()) if running else None
+                if futures:
+                    done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    done = set()
+                    time.sleep(timeout)
+                
+                for future in done:
+                    key, job, stage = futures.pop(future)
+                    item = submitting.pop(future, None)
+                    if stage == "fetch":
+                        # The job was forgotten, so its reservation is released
+                        released = True
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if stage == "submit" and getattr(e, "reason", None) == "budgetReserved":
+                            held.append(item)
+                            continue
+                        if stage == "poll":
+                            # The job's state is unknown; don't leave it running unreported
+                            self._abandon(job)
+                            released = True
+                        yield key, False, job, BigQueryError.from_exception(
+                            "running job", e, job_id=job.job_id if job else None
+                        )
+                        continue
+                    
+                    if stage == "fetch":
+                        yield key, True, job, result
+                    elif stage == "poll":
+                        if result:
+                            futures[executor.submit(self._fetch_results, job)] = (key, job, "fetch")
+                        else:
+                            running[id(job)] = (key, job)
+                    elif result.dry_run:
+                        yield key, True, result, []
+                    else:
+                        running[id(result)] = (key, result)
+                
+                if running and time.monotonic() - last_poll >= self.poll_interval:
+                    last_poll = time.monotonic()
+                    for key, job in running.values():
+                        futures[executor.submit(self._poll_done, job)] = (key, job, "poll")
+                    running.clear()
+        finally:
+            # Don't leave jobs running (and billing) if the caller stops early
+            polling = [(key, job) for key, job, stage in futures.values() if stage == "poll"]
+            for key, job in list(running.values()) + polling:
+                self._abandon(job)
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _submit(self, item, block):
+        """Submit one job item, waiting for budget room only if block is True"""
+        job_config = item[2] if len(item) > 2 else None
+        options = item[3] if len(item) > 3 else {}
+        return self.bq.submit_query(item[1], job_config, block=block, **options)
+    
+    def _poll_done(self, job):
+        """Refresh one job's state with a single status request and return whether it finished"""
+        return job.done(retry=DEFAULT_RETRY, timeout=self.bq.timeout)
+    
+    def _abandon(self, job):
+        """Cancel a job that won't be waited for and stop tracking it"""
+        try:
+            job.cancel(timeout=self.bq.timeout)
+        except Exception:
+            pass
+        self.bq.forget_job(job)
+    
+    def _fetch_results(self, job):
+        """Fetch all result rows of a finished job"""
+        try:
+            rows = list(job.result(retry=DEFAULT_RETRY, timeout=self.bq.job_timeout))
+        except Exception:
+            self.bq.forget_job(job)
+            raise
+        self.bq.forget_job(job)
+        return rows
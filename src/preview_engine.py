@@ -0,0 +1,134 @@
+"""
+Module for streaming, paged table previews backed by Arrow record batches
+"""
+import json
+import os
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pa_parquet
+from src.formatter import calculate_max_width, format_preview_row
+
+class PreviewEngine:
+    """Streams table previews page by page and exports them to CSV or Parquet"""
+
+    def __init__(self, bq_connector, page_size=10):
+        """
+        Initialize preview engine.
+
+        Args:
+            bq_connector: BigQuery connector instance
+            page_size: Number of rows fetched and rendered per page
+        """
+        self.bq = bq_connector
+        self.page_size = page_size
+
+    def open(self, table_name, columns=None, limit=50):
+        """Start streaming a preview; returns (success, result) like BigQueryConnector"""
+        success, preview = self.bq.stream_table_rows(
+            table_name, columns=columns, limit=limit, page_size=self.page_size
+        )
+        if success:
+            # Batches already streamed, so an export doesn't fetch (or bill) them again
+            preview['fetched'] = []
+        return success, preview
+
+    @staticmethod
+    def batches(preview):
+        """Yield the batches streamed so far, then keep streaming the rest"""
+        yield from list(preview['fetched'])
+        for batch in preview['batches']:
+            preview['fetched'].append(batch)
+            yield batch
+
+    @staticmethod
+    def csv_table(table):
+        """Make a table writable as CSV: flatten structs and JSON-encode arrays"""
+        while any(pa.types.is_struct(field.type) for field in table.schema):
+            table = table.flatten()
+
+        columns = []
+        for field, column in zip(table.schema, table.columns):
+            if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+                column = pa.array([None if value is None else json.dumps(value, default=str)
+                                   for value in column.to_pylist()], pa.string())
+            columns.append(column)
+        return pa.Table.from_arrays(columns, names=table.column_names)
+
+    def render_batch(self, batch, preview, start_row=1):
+        """Format one record batch in the transposed layout, returning a list of lines"""
+        max_width = calculate_max_width(preview['schema'], preview['column_types'])
+
+        lines = []
+        # Values are only converted to strings here, one page at a time
+        for row_idx, row in enumerate(batch.to_pylist(), start_row):
+            lines.append(f"\n--- Row {row_idx} ---")
+            display_row = {col: str(val) for col, val in row.items()}
+            lines.extend(format_preview_row(display_row, preview['schema'],
+                                            preview['column_types'], max_width))
+        return lines
+
+    def page(self, preview):
+        """Render the preview one batch at a time, waiting for the user between pages"""
+        row_count = 0
+        for batch in self.batches(preview):
+            if batch.num_rows == 0:
+                continue
+
+            for line in self.render_batch(batch, preview, row_count + 1):
+                print(line)
+            row_count += batch.num_rows
+
+            if input("\nPress Enter for more rows, or 'q' to stop: ").strip().lower() == 'q':
+                break
+
+        print(f"\nShown {row_count} rows.")
+        return row_count
+
+    def export(self, preview, path):
+        """
+        Export a preview opened with open() to a CSV or Parquet file, writing batch by batch.
+
+        Rows already paged through are reused and the rest is streamed from the same
+        result, so the query isn't run again. In CSV files, RECORD columns are
+        flattened into one column per field and REPEATED columns are JSON-encoded.
+
+        Args:
+            preview: Preview returned by open()
+            path: Output file path ending in .csv or .parquet
+
+        Returns:
+            Tuple of (success, message)
+        """
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in ('.csv', '.parquet'):
+            return False, "Export path must end in .csv or .parquet"
+
+        writer = None
+        row_count = 0
+        error = None
+        try:
+            for batch in self.batches(preview):
+                table = pa.Table.from_batches([batch])
+                if extension == '.csv':
+                    table = self.csv_table(table)
+                if writer is None:
+                    if extension == '.csv':
+                        writer = pa_csv.CSVWriter(path, table.schema)
+                    else:
+                        writer = pa_parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                row_count += batch.num_rows
+        except Exception as e:
+            error = e
+        finally:
+            if writer is not None:
+                writer.close()
+
+        if error is not None:
+            # Don't leave a partial file behind
+            if os.path.exists(path):
+                os.remove(path)
+            return False, f"Error exporting preview: {error}"
+        if writer is None:
+            return False, "No rows to export"
+        return True, f"Exported {row_count} rows to {path}"
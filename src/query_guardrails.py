@@ -0,0 +1,263 @@
+"""
+Module for query cost guardrails: bytes-billed caps, job labels and cost budgets
+"""
+import re
+import threading
+from contextlib import contextmanager
+from google.cloud import bigquery
+from src.formatter import format_bytes
+
+# Label value applied to every job so billing exports can attribute spend
+TOOL_LABEL = "bronzemaker"
+
+# On-demand price used to show estimated cost; actual pricing depends on the project
+PRICE_PER_TIB = 6.25
+
+SIZE_UNITS = {
+    "": 1, "B": 1,
+    "KB": 1000, "MB": 1000 ** 2, "GB": 1000 ** 3, "TB": 1000 ** 4,
+    "KIB": 1024, "MIB": 1024 ** 2, "GIB": 1024 ** 3, "TIB": 1024 ** 4
+}
+
+def parse_size(value):
+    """Parse a size such as "500GB", "1.5TiB" or "1048576" into a number of bytes"""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([a-zA-Z]*)\s*", str(value))
+    if not match or match.group(2).upper() not in SIZE_UNITS:
+        raise ValueError(f"Invalid size: {value}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+def label_value(value):
+    """Turn a dataset/table name into a valid BigQuery label value"""
+    return re.sub(r"[^a-z0-9_-]", "_", str(value).lower())[:63]
+
+def add_guardrail_arguments(parser):
+    """Add the guardrail command-line options to an argparse parser"""
+    parser.add_argument(
+        '--max-bytes-billed',
+        type=parse_size,
+        default=parse_size("100GiB"),
+        help='Maximum bytes a single query may bill, e.g. 50GB or 1TiB (default: 100GiB)'
+    )
+    parser.add_argument(
+        '--session-budget',
+        type=parse_size,
+        help='Maximum bytes billed over the whole session (default: unlimited)'
+    )
+    parser.add_argument(
+        '--command-budget',
+        type=parse_size,
+        help='Maximum bytes billed by a single command (default: unlimited)'
+    )
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Run queries with BATCH instead of INTERACTIVE priority'
+    )
+
+def guardrails_from_args(args):
+    """Create QueryGuardrails from options added by add_guardrail_arguments"""
+    return QueryGuardrails(
+        max_bytes_billed=args.max_bytes_billed,
+        session_budget=args.session_budget,
+        command_budget=args.command_budget,
+        priority=bigquery.QueryPriority.BATCH if args.batch else bigquery.QueryPriority.INTERACTIVE
+    )
+
+class QueryGuardrails:
+    """Applies bytes-billed caps, labels and priority to jobs and tracks spend against budgets"""
+    
+    def __init__(self, max_bytes_billed=parse_size("100GiB"), session_budget=None,
+                 command_budget=None, priority=bigquery.QueryPriority.INTERACTIVE):
+        """
+        Initialize query guardrails.
+        
+        Args:
+            max_bytes_billed: Maximum bytes a single query may bill; BigQuery refuses
+                larger queries before billing anything. None disables the cap.
+            session_budget: Maximum bytes billed over the whole session (None: unlimited)
+            command_budget: Maximum bytes billed by a single command (None: unlimited)
+            priority: Query priority, INTERACTIVE or BATCH
+        """
+        self.max_bytes_billed = max_bytes_billed
+        self.session_budget = session_budget
+        self.command_budget = command_budget
+        self.priority = priority
+        self.command_name = None
+        self.session_bytes = 0
+        self.command_bytes = 0
+        # Caps of submitted jobs that haven't been charged yet, so concurrent jobs
+        # can't together bill more than what is left of a budget
+        self.session_reserved = 0
+        self.command_reserved = 0
+        self._command_id = 0
+        self._lock = threading.Lock()
+        # Notified whenever a reservation is released
+        self._room = threading.Condition(self._lock)
+    
+    @contextmanager
+    def command(self, name):
+        """Track spend for one command separately from the rest of the session"""
+        with self._lock:
+            self.command_name = name
+            self.command_bytes = 0
+            self.command_reserved = 0
+            self._command_id += 1
+            self._room.notify_all()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self.command_name = None
+    
+    def _remaining_bytes(self, reserved=False):
+        """remaining_bytes() without taking the lock, optionally also minus the reservations"""
+        limits = []
+        if self.session_budget is not None:
+            limits.append(self.session_budget - self.session_bytes
+                          - (self.session_reserved if reserved else 0))
+        if self.command_budget is not None and self.command_name is not None:
+            limits.append(self.command_budget - self.command_bytes
+                          - (self.command_reserved if reserved else 0))
+        return min(limits) if limits else None
+    
+    def remaining_bytes(self):
+        """Bytes that can still be billed before a budget runs out (None: unlimited)"""
+        with self._lock:
+            return self._remaining_bytes()
+    
+    def _refusal(self):
+        """check() without taking the lock"""
+        if self.session_budget is not None and self.session_bytes >= self.session_budget:
+            return (f"Session budget exhausted: {format_bytes(self.session_bytes)} billed "
+                    f"of {format_bytes(self.session_budget)} allowed. "
+                    f"Restart with a higher --session-budget to continue.")
+        if (self.command_budget is not None and self.command_name is not None
+                and self.command_bytes >= self.command_budget):
+            return (f"Budget for '{self.command_name}' exhausted: "
+                    f"{format_bytes(self.command_bytes)} billed of "
+                    f"{format_bytes(self.command_budget)} allowed. "
+                    f"Use a higher --command-budget to continue.")
+        return None
+    
+    def check(self):
+        """Return a refusal message if a budget is exhausted, otherwise None"""
+        with self._lock:
+            return self._refusal()
+    
+    def apply(self, job_config=None, dataset_id=None, table_id=None, phase=None):
+        """
+        Apply the bytes-billed cap, labels and priority to a job config.
+        
+        Settings already present on the job config win, except that the bytes
+        billed cap never exceeds what is left of the budgets.
+        
+        Returns:
+            The (possibly new) QueryJobConfig
+        """
+        job_config = job_config or bigquery.QueryJobConfig()
+        
+        labels = {"tool": TOOL_LABEL}
+        if dataset_id:
+            labels["dataset"] = label_value(dataset_id)
+        if table_id:
+            labels["table"] = label_value(table_id)
+        if phase or self.command_name:
+            labels["phase"] = label_value(phase or self.command_name)
+        labels.update(job_config.labels or {})
+        job_config.labels = labels
+        
+        if job_config.priority is None:
+            job_config.priority = self.priority
+        
+        caps = [cap for cap in (job_config.maximum_bytes_billed, self.max_bytes_billed,
+                                self.remaining_bytes()) if cap is not None]
+        if caps:
+            job_config.maximum_bytes_billed = max(min(caps), 0)
+        
+        return job_config
+    
+    def reserve(self, job_config, block=True):
+        """
+        Reserve a job's bytes-billed cap against the budgets right before it's submitted.
+        
+        The job only starts once its cap fits in what is left of the budgets after
+        the reservations of the other running jobs, so concurrent jobs never overshoot
+        a budget together. Until then it waits for running jobs to finish and release
+        their reservations. If other jobs' reservations aren't what is in the way,
+        the cap is lowered to what is left instead.
+        
+        Args:
+            job_config: QueryJobConfig with the cap set by apply()
+            block: Wait for room; if False, return a "budgetReserved" refusal instead
+        
+        Returns:
+            Tuple of (reservation, refusal). Pass the reservation to record() once the
+            job finishes, or to release() if it was never submitted. refusal is a
+            (reason, message) pair if the job can't start, with reason "budgetExceeded"
+            once billed bytes used up a budget; nothing is reserved then.
+        """
+        with self._room:
+            while True:
+                refusal = self._refusal()
+                if refusal:
+                    return None, ("budgetExceeded", refusal)
+                
+                remaining = self._remaining_bytes()
+                if remaining is None:
+                    # Without budgets there is nothing to reserve against
+                    return None, None
+                
+                unreserved = self._remaining_bytes(reserved=True)
+                cap = job_config.maximum_bytes_billed
+                if (cap is not None and cap <= unreserved) or unreserved >= remaining:
+                    cap = unreserved if cap is None else min(cap, unreserved)
+                    break
+                
+                if not block:
+                    return None, ("budgetReserved",
+                                  f"{format_bytes(remaining - unreserved)} of the remaining budget "
+                                  f"is reserved by running queries; waiting for them to finish.")
+                self._room.wait()
+            
+            job_config.maximum_bytes_billed = cap
+            command_id = self._command_id if self.command_name is not None else None
+            self.session_reserved += cap
+            if command_id is not None:
+                self.command_reserved += cap
+            return (cap, command_id), None
+    
+    def _release(self, reservation):
+        """release() without taking the lock"""
+        if reservation is None:
+            return
+        amount, command_id = reservation
+        self.session_reserved -= amount
+        # Reservations made during an earlier command were reset when it started
+        if command_id is not None and command_id == self._command_id:
+            self.command_reserved -= amount
+        self._room.notify_all()
+    
+    def release(self, reservation):
+        """Give back a reservation made by reserve() for a job that won't bill anything"""
+        with self._lock:
+            self._release(reservation)
+    
+    def record(self, job, reservation=None):
+        """
+        Charge the bytes billed by a finished job to the budgets, releasing its reservation.
+        
+        The command budget is only charged if the job was reserved during the current
+        command, so a job started by an earlier command doesn't count against a later one.
+        """
+        billed = job.total_bytes_billed or 0
+        with self._lock:
+            self._release(reservation)
+            self.session_bytes += billed
+            if reservation is not None and reservation[1] == self._command_id:
+                self.command_bytes += billed
+        return billed
+    
+    def summary(self):
+        """Describe the bytes billed so far this session and their estimated cost"""
+        cost = self.session_bytes / 1024 ** 4 * PRICE_PER_TIB
+        return f"Billed {format_bytes(self.session_bytes)} this session (~${cost:.2f} on-demand)"
@@ -0,0 +1,66 @@
+"""
+Module for working with nested (RECORD/REPEATED) BigQuery schemas
+"""
+
+# Suffix marking a repeated (ARRAY) part of a column path, e.g. "items[].sku"
+REPEATED_SUFFIX = "[]"
+
+class ColumnLeaf:
+    """A non-RECORD column of a possibly nested schema, identified by its path"""
+
+    __slots__ = ("parts", "field_type")
+
+    def __init__(self, parts, field_type):
+        """
+        Initialize column leaf.
+
+        Args:
+            parts: Tuple of (name, repeated) pairs from the top-level column down to the leaf
+            field_type: BigQuery type of the leaf, e.g. "STRING"
+        """
+        self.parts = parts
+        self.field_type = field_type
+
+    @property
+    def path(self):
+        """Column path used as the config key, e.g. "payload.items[].sku" """
+        return join_column_path(self.parts)
+
+    @property
+    def repeated(self):
+        """Whether the leaf sits inside an ARRAY (or is one)"""
+        return any(repeated for _, repeated in self.parts)
+
+def join_column_path(parts):
+    """Join (name, repeated) pairs into a column path"""
+    return ".".join(f"{name}{REPEATED_SUFFIX if repeated else ''}" for name, repeated in parts)
+
+def split_column_path(path):
+    """Split a column path into (name, repeated) pairs"""
+    parts = []
+    for part in path.split("."):
+        if part.endswith(REPEATED_SUFFIX):
+            parts.append((part[:-len(REPEATED_SUFFIX)], True))
+        else:
+            parts.append((part, False))
+    return parts
+
+def flatten_schema(schema, parents=()):
+    """
+    Flatten a BigQuery schema into its leaf columns, depth first.
+
+    Args:
+        schema: List of SchemaField objects
+        parents: (name, repeated) pairs of the enclosing RECORD fields
+
+    Returns:
+        List of ColumnLeaf objects in schema order
+    """
+    leaves = []
+    for field in schema:
+        parts = parents + ((field.name, field.mode == "REPEATED"),)
+        if field.field_type in ("RECORD", "STRUCT"):
+            leaves.extend(flatten_schema(field.fields, parts))
+        else:
+            leaves.append(ColumnLeaf(parts, field.field_type))
+    return leaves
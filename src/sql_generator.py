@@ -2,6 +2,8 @@
 Module for generating SQL views based on templates and configurations
 """
 import os
+import re
+from src.schema_utils import join_column_path, split_column_path
 
 class SQLGenerator:
     """Generates SQL views based on templates and configurations"""
@@ -10,21 +12,104 @@ class SQLGenerator:
         self.template_manager = template_manager
         self.output_dir = output_dir
     
+    @staticmethod
+    def indent(sql, prefix="    "):
+        """Indent every line of a SQL fragment"""
+        return "\n".join(f"{prefix}{line}" for line in sql.split("\n"))
+    
+    def build_column_tree(self, column_configs):
+        """
+        Group column configs by their path into a tree of nested columns.
+        
+        Each node is a dict with "repeated", "template" (for leaves) and "children".
+        Plain top-level columns become leaves at the first level, so flat configs
+        render exactly as before.
+        """
+        tree = {}
+        for column_path, template_type in column_configs.items():
+            nodes = tree
+            parts = split_column_path(column_path)
+            for depth, (name, repeated) in enumerate(parts):
+                node = nodes.setdefault(name, {"repeated": repeated, "template": None, "children": {}})
+                if depth == len(parts) - 1:
+                    node["template"] = template_type
+                nodes = node["children"]
+        return tree
+    
+    def render_expression(self, template, source):
+        """Render a column template for a source expression, without its trailing alias"""
+        sql = template.format(column_name=source).rstrip()
+        return re.sub(rf"\s+AS\s+{re.escape(source)}$", "", sql)
+    
+    def render_column(self, name, node, source, path):
+        """
+        Render the SQL for a column, re-assembling STRUCTs and ARRAYs from their leaves.
+        
+        Args:
+            name: Name of the output column or struct field
+            node: Column tree node, see build_column_tree
+            source: SQL expression holding the source value
+            path: Full column path as used in the config, e.g. "items[].qty"; used in comments
+            
+        Returns:
+            SQL fragment aliased as name, or None if the column is skipped entirely
+        """
+        element = f"{name}_element"
+        
+        if not node["children"]:
+            template_type = node["template"]
+            if template_type == 'skip':
+                return None
+            elif template_type == 'custom':
+                if source == name:
+                    return f"-- custom: {path}"
+                # Keep nested values as they are so the struct stays valid
+                return f"-- custom: {path}\n{source} AS {name}"
+            
+            template = self.template_manager.get_template(template_type)
+            if not template:
+                return None
+            if not node["repeated"]:
+                if source == name:
+                    return template.format(column_name=name)
+                return f"{self.render_expression(template, source)} AS {name}"
+            
+            # Transform each element; ARRAY_AGG drops NULLs, which arrays can't hold
+            expression = self.render_expression(template, element)
+            return (f"(SELECT ARRAY_AGG({expression} IGNORE NULLS ORDER BY {element}_offset) "
+                    f"FROM UNNEST({source}) AS {element} WITH OFFSET AS {element}_offset) AS {name}")
+        
+        child_source = element if node["repeated"] else source
+        fields = []
+        for child_name, child in node["children"].items():
+            child_path = join_column_path([(child_name, child["repeated"])])
+            sql = self.render_column(child_name, child, f"{child_source}.{child_name}",
+                                     f"{path}.{child_path}")
+            if sql:
+                fields.append(self.indent(sql, "        " if node["repeated"] else "    "))
+        if not fields:
+            return None
+        fields = ',\n'.join(fields)
+        
+        if node["repeated"]:
+            return (f"ARRAY(\n"
+                    f"    SELECT AS STRUCT\n{fields}\n"
+                    f"    FROM UNNEST({source}) AS {element} WITH OFFSET AS {element}_offset\n"
+                    f"    ORDER BY {element}_offset\n"
+                    f") AS {name}")
+        return f"IF({source} IS NULL, NULL, STRUCT(\n{fields}\n)) AS {name}"
+    
     def generate_sql(self, dataset_id, table_id, column_configs):
         """Generate SQL view for a table based on column configurations"""
         base_template = self.template_manager.get_template('base')
         
         # Generate column transformations
         column_sql = []
-        for column_name, template_type in column_configs.items():
-            if template_type == 'skip':
-                continue
-            elif template_type == 'custom':
-                column_sql.append(f"    -- custom: {column_name}")
-            else:
-                template = self.template_manager.get_template(template_type)
-                if template:
-                    column_sql.append(f"    {template.format(column_name=column_name)}")
+        for column_name, node in self.build_column_tree(column_configs).items():
+            path = join_column_path([(column_name, node["repeated"])])
+            sql = self.render_column(column_name, node, column_name, path)
+            if sql:
+                column_sql.append(self.indent(sql))
         
         # Determine the source and bronze dataset names
         source_dataset = dataset_id
@@ -3,6 +3,8 @@ Module for creating tables from SQL view files
 """
 import os
 import re
+from google.cloud import bigquery
+from src.job_engine import JobEngine
 
 class TableCreator:
     """Creates BigQuery views from generated SQL files"""
@@ -61,7 +63,7 @@ class TableCreator:
             return False, f"SQL file for {dataset_id}.{table_id} not found"
         
         # Execute query
-        success, message = self.bq.execute_query(sql)
+        success, message = self.bq.execute_query(sql, dataset_id=dataset_id, table_id=table_id)
         
         if success:
             try:
@@ -95,4 +97,35 @@ class TableCreator:
                     "error": f"Could not preview table: {e}"
                 }
         
-        return success, message 
\ No newline at end of file
+        return success, message 
+    
+    def create_tables(self, tables, dry_run=False, max_in_flight=20):
+        """
+        Create (or dry-run) many tables concurrently.
+        
+        Args:
+            tables: Iterable of (dataset_id, table_id) pairs
+            dry_run: Only validate the SQL files instead of creating the views
+            max_in_flight: Maximum number of BigQuery jobs running at once
+            
+        Yields:
+            Tuples of (dataset_id, table_id, success, message) as each job completes
+        """
+        jobs = []
+        for dataset_id, table_id in tables:
+            sql = self.read_sql_file(dataset_id, table_id)
+            if not sql:
+                yield dataset_id, table_id, False, f"SQL file for {dataset_id}.{table_id} not found"
+                continue
+            job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False) if dry_run else None
+            # The guardrails cap and label the job when it is submitted
+            options = {"dataset_id": dataset_id, "table_id": table_id,
+                       "phase": "validate" if dry_run else "deploy"}
+            jobs.append(((dataset_id, table_id), sql, job_config, options))
+        
+        engine = JobEngine(self.bq, max_in_flight=max_in_flight)
+        for (dataset_id, table_id), success, job, result in engine.run(jobs):
+            if not success:
+                yield dataset_id, table_id, False, result
+            else:
+                yield dataset_id, table_id, True, self.bq.job_message(job)
\ No newline at end of file
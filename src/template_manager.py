@@ -41,7 +41,8 @@ FROM `{source_dataset}.{table_name}`""",
                 with open(filepath, 'w') as f:
                     f.write(content)
         
-        # Load all templates
+        # Load all templates (reset first so deleted files disappear on reload)
+        self.templates = {}
         for filename in os.listdir(self.template_dir):
             if filename.endswith('.sql'):
                 with open(os.path.join(self.template_dir, filename), 'r') as f:
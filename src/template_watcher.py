@@ -0,0 +1,167 @@
+"""
+Module for watching templates and configs and regenerating affected SQL files
+"""
+import os
+import time
+
+class TemplateWatcher:
+    """Polls templates and configs and rebuilds only the SQL files affected by a change"""
+    
+    def __init__(self, template_manager, config_manager, sql_generator,
+                 table_creator=None, action=None, interval=1.0, debounce=0.5):
+        """
+        Initialize template watcher.
+        
+        Args:
+            template_manager: Template manager instance
+            config_manager: Config manager instance
+            sql_generator: SQL generator instance
+            table_creator: Optional table creator used to validate or deploy rebuilt files
+            action: None, 'dry-run' or 'deploy'
+            interval: Seconds between file system polls
+            debounce: Seconds without further changes before a rebuild starts
+        """
+        self.templates = template_manager
+        self.configs = config_manager
+        self.sql_generator = sql_generator
+        self.table_creator = table_creator
+        self.action = action
+        self.interval = interval
+        self.debounce = debounce
+        self.index = {}
+    
+    def snapshot(self):
+        """Return a mapping of watched file paths to their modification times"""
+        mtimes = {}
+        
+        template_dir = self.templates.template_dir
+        if os.path.exists(template_dir):
+            for filename in os.listdir(template_dir):
+                if filename.endswith('.sql'):
+                    path = os.path.join(template_dir, filename)
+                    mtimes[path] = os.stat(path).st_mtime_ns
+        
+        for dataset_id, table_id in self.configs.list_configs():
+            path = os.path.join(self.configs.config_dir, dataset_id, f"{table_id}.json")
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+        
+        return mtimes
+    
+    def build_index(self):
+        """Build the reverse index from template name to the tables whose config uses it"""
+        index = {}
+        for dataset_id, table_id in self.configs.list_configs():
+            try:
+                column_configs = self.configs.load_config(dataset_id, table_id)
+            except ValueError as e:
+                print(f"Skipping invalid config {dataset_id}.{table_id}: {e}")
+                continue
+            if not column_configs:
+                continue
+            
+            # Every table depends on the base template
+            for template_name in set(column_configs.values()) | {'base'}:
+                index.setdefault(template_name, set()).add((dataset_id, table_id))
+        
+        self.index = index
+        return index
+    
+    def affected_tables(self, changed_paths):
+        """Map changed file paths to the set of (dataset_id, table_id) pairs to rebuild"""
+        template_dir = os.path.normpath(self.templates.template_dir)
+        affected = set()
+        
+        for path in changed_paths:
+            directory, filename = os.path.split(os.path.normpath(path))
+            if directory == template_dir:
+                affected |= self.index.get(filename[:-4], set())
+            else:
+                dataset_id = os.path.basename(directory)
+                affected.add((dataset_id, filename[:-5]))
+        
+        return affected
+    
+    def rebuild(self, tables):
+        """Regenerate the SQL files for the given tables and optionally validate or deploy them"""
+        results = {}
+        rebuilt = []
+        for dataset_id, table_id in sorted(tables):
+            try:
+                column_configs = self.configs.load_config(dataset_id, table_id)
+                if column_configs is None:
+                    # Config was deleted; nothing to rebuild
+                    continue
+                
+                sql_path = self.sql_generator.generate_sql(dataset_id, table_id, column_configs)
+            except Exception as e:
+                # e.g. a half-saved config (invalid JSON) or a template with a stray brace;
+                # report it and keep watching, the next save triggers another rebuild
+                print(f"  [FAILED] {dataset_id}.{table_id}: {e}")
+                results[(dataset_id, table_id)] = (False, str(e))
+                continue
+            
+            print(f"SQL view file regenerated: {sql_path}")
+            results[(dataset_id, table_id)] = (True, sql_path)
+            rebuilt.append((dataset_id, table_id))
+        
+        if self.table_creator is None or self.action is None or not rebuilt:
+            return results
+        
+        # Send all rebuilt files to BigQuery at once instead of one after another
+        dry_run = self.action != 'deploy'
+        with self.table_creator.bq.guardrails.command(self.action):
+            for dataset_id, table_id, success, result in self.table_creator.create_tables(rebuilt, dry_run=dry_run):
+                status = "OK" if success else "FAILED"
+                print(f"  [{status}] {dataset_id}.{table_id}: {result}")
+                results[(dataset_id, table_id)] = (success, result)
+        
+        return results
+    
+    def poll_changes(self, previous):
+        """Compare the current snapshot with a previous one and return (snapshot, changed paths)"""
+        current = self.snapshot()
+        changed = {path for path, mtime in current.items() if previous.get(path) != mtime}
+        changed |= set(previous) - set(current)
+        return current, changed
+    
+    def run(self):
+        """Watch for changes until interrupted"""
+        previous = self.snapshot()
+        self.build_index()
+        print(f"Watching {self.templates.template_dir}/ and {self.configs.config_dir}/ "
+              f"({len(self.configs.list_configs())} configs). Press Ctrl+C to stop.")
+        
+        pending = set()
+        last_change = None
+        try:
+            while True:
+                time.sleep(self.interval if not pending else min(self.interval, self.debounce))
+                previous, changed = self.poll_changes(previous)
+                
+                if changed:
+                    pending |= changed
+                    last_change = time.monotonic()
+                    continue
+                
+                # Wait until the files have been quiet for the debounce period
+                if not pending or time.monotonic() - last_change < self.debounce:
+                    continue
+                
+                changed_templates = any(path.endswith('.sql') for path in pending)
+                if changed_templates:
+                    self.templates.load_templates()
+                
+                # Rebuild the index before and after so new and removed templates are both covered
+                tables = self.affected_tables(pending)
+                self.build_index()
+                tables |= self.affected_tables(pending)
+                pending = set()
+                
+                if tables:
+                    print(f"\nChange detected, rebuilding {len(tables)} table(s)...")
+                    self.rebuild(tables)
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Utility to watch templates and configs and regenerate affected SQL views
+"""
+import argparse
+from src.template_manager import TemplateManager
+from src.config_manager import ConfigManager
+from src.sql_generator import SQLGenerator
+from src.template_watcher import TemplateWatcher
+from src.query_guardrails import add_guardrail_arguments, guardrails_from_args
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description='Watch templates and configs and regenerate SQL views')
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--dry-run', action='store_true', help='Dry-run rebuilt SQL files in BigQuery')
+    action.add_argument('--deploy', action='store_true', help='Create the views for rebuilt SQL files')
+    parser.add_argument('--credentials', '-c', help='Path to the Google Cloud service account JSON credentials file')
+    parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls (default: 1.0)')
+    parser.add_argument('--debounce', type=float, default=0.5, help='Quiet period before rebuilding (default: 0.5)')
+    add_guardrail_arguments(parser)
+    
+    args = parser.parse_args()
+    
+    template_manager = TemplateManager()
+    config_manager = ConfigManager()
+    sql_generator = SQLGenerator(template_manager)
+    
+    table_creator = None
+    watch_action = None
+    if args.dry_run or args.deploy:
+        # Only connect to BigQuery when rebuilt files are sent there
+        from src.bigquery_connector import BigQueryConnector
+        from src.table_creator import TableCreator
+        table_creator = TableCreator(BigQueryConnector(
+            credentials_path=args.credentials, guardrails=guardrails_from_args(args)
+        ))
+        watch_action = 'deploy' if args.deploy else 'dry-run'
+    
+    watcher = TemplateWatcher(
+        template_manager, config_manager, sql_generator,
+        table_creator=table_creator, action=watch_action,
+        interval=args.interval, debounce=args.debounce
+    )
+    try:
+        watcher.run()
+    finally:
+        if table_creator is not None:
+            table_creator.bq.close()
+
+if __name__ == "__main__":
+    main()